@@ -7,9 +7,75 @@ from datetime import datetime, timedelta
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+LOGIN_USER_QUERY = """
+    SELECT id, name, email, role, password_hash
+    FROM users
+    WHERE email = $1
+"""
+
+VERIFY_SESSION_QUERY = """
+    SELECT s.id, s.user_id, s.expires_at, u.name, u.email, u.role
+    FROM user_sessions s
+    JOIN users u ON s.user_id = u.id
+    WHERE s.session_token = $1
+"""
+
+_conn = None
+_prepared = set()
+
 def get_db_connection():
-    """Создание подключения к базе данных"""
-    return psycopg2.connect(os.environ['DATABASE_URL'])
+    """Подключение к базе данных, переиспользуемое между вызовами функции"""
+    global _conn
+    if _conn is None or _conn.closed:
+        _conn = psycopg2.connect(
+            os.environ['DATABASE_URL'],
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3
+        )
+        _prepared.clear()
+    return _conn
+
+def release_db_connection():
+    """Завершение транзакции запроса без закрытия подключения"""
+    if _conn is None or _conn.closed:
+        return
+    try:
+        _conn.rollback()
+    except psycopg2.Error:
+        _conn.close()
+
+def execute_prepared(cur, name: str, sql: str, params: list):
+    """Выполнение запроса по имени; PREPARE выполняется один раз на подключение.
+
+    Подготовленные запросы живут в серверной сессии, поэтому DATABASE_URL должен
+    вести напрямую в Postgres или через пулер в режиме сессий (не транзакций).
+    """
+    if name not in _prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        _prepared.add(name)
+    if params:
+        placeholders = ', '.join(['%s'] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+def execute_first(cur, sql: str, params, prepared: str = None) -> tuple:
+    """Первый запрос обработчика с одним повтором при разорванном подключении.
+
+    Сервер может закрыть простаивающее подключение между вызовами функции.
+    До первого запроса транзакция пуста, поэтому после переподключения его
+    можно безопасно повторить, в том числе для записи.
+    """
+    for attempt in range(2):
+        try:
+            if prepared:
+                execute_prepared(cur, prepared, sql, params)
+            else:
+                cur.execute(sql, params)
+            return cur.connection, cur
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if attempt or not cur.connection.closed:
+                raise
+            cur = get_db_connection().cursor(cursor_factory=type(cur))
 
 def hash_password(password: str) -> str:
     """Хеширование пароля"""
@@ -77,6 +143,8 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': str(e)}),
             'isBase64Encoded': False
         }
+    finally:
+        release_db_connection()
 
 def register_user(body: dict) -> dict:
     """Регистрация нового пользователя"""
@@ -104,7 +172,7 @@ def register_user(body: dict) -> dict:
     try:
         password_hash = hash_password(body['password'])
         
-        cur.execute("""
+        conn, cur = execute_first(cur, """
             INSERT INTO users (name, email, phone, role, password_hash, bio, specializations)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             RETURNING id, name, email, role
@@ -159,7 +227,6 @@ def register_user(body: dict) -> dict:
         }
     finally:
         cur.close()
-        conn.close()
 
 def login_user(body: dict) -> dict:
     """Вход пользователя в систему"""
@@ -175,11 +242,7 @@ def login_user(body: dict) -> dict:
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     try:
-        cur.execute("""
-            SELECT id, name, email, role, password_hash
-            FROM users
-            WHERE email = %s
-        """, (body['email'],))
+        conn, cur = execute_first(cur, LOGIN_USER_QUERY, [body['email']], prepared='login_user')
         
         user = cur.fetchone()
         
@@ -222,7 +285,6 @@ def login_user(body: dict) -> dict:
         }
     finally:
         cur.close()
-        conn.close()
 
 def verify_session(event: dict) -> dict:
     """Проверка сессии пользователя"""
@@ -243,12 +305,7 @@ def verify_session(event: dict) -> dict:
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     try:
-        cur.execute("""
-            SELECT s.id, s.user_id, s.expires_at, u.name, u.email, u.role
-            FROM user_sessions s
-            JOIN users u ON s.user_id = u.id
-            WHERE s.session_token = %s
-        """, (session_token,))
+        conn, cur = execute_first(cur, VERIFY_SESSION_QUERY, [session_token], prepared='verify_session')
         
         session = cur.fetchone()
         
@@ -291,7 +348,6 @@ def verify_session(event: dict) -> dict:
         }
     finally:
         cur.close()
-        conn.close()
 
 def logout_user(event: dict) -> dict:
     """Выход пользователя из системы"""
@@ -312,7 +368,7 @@ def logout_user(event: dict) -> dict:
     cur = conn.cursor()
     
     try:
-        cur.execute("DELETE FROM user_sessions WHERE session_token = %s", (session_token,))
+        conn, cur = execute_first(cur, "DELETE FROM user_sessions WHERE session_token = %s", (session_token,))
         conn.commit()
         
         return {
@@ -322,5 +378,4 @@ def logout_user(event: dict) -> dict:
             'isBase64Encoded': False
         }
     finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+        cur.close()
\ No newline at end of file
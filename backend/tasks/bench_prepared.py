@@ -0,0 +1,79 @@
+"""Сравнение времени планирования горячих запросов: обычный запрос против EXECUTE
+
+Запуск: DATABASE_URL=postgresql://... python backend/tasks/bench_prepared.py [повторов]
+
+Для каждого запроса выполняется EXPLAIN (ANALYZE) исходного текста и
+EXPLAIN (ANALYZE) EXECUTE подготовленного запроса, выводится медиана Planning Time.
+Первые пять выполнений подготовленного запроса Postgres планирует заново
+(custom plan), поэтому повторов должно быть заметно больше пяти.
+"""
+import importlib.util
+import os
+import re
+import statistics
+import sys
+import psycopg2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_function(name: str):
+    """Загрузка index.py функции по имени каталога"""
+    spec = importlib.util.spec_from_file_location(f'{name}_index', os.path.join(BACKEND_DIR, name, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def hot_statements() -> list:
+    """Горячие запросы обработчиков: (имя, текст с $N, параметры)"""
+    tasks = load_function('tasks')
+    auth = load_function('auth')
+    users = load_function('users')
+    statements = []
+    radius_name, radius_params = tasks.radius_filter(55.7558, 37.6173, 50)
+    for filters in [
+        {},
+        {'category': ['Ремонт']},
+        {'status': ['new']},
+        {'category': ['Ремонт'], 'status': ['new']},
+        {'city': ['москва'], 'district': ['свао']},
+        {radius_name: radius_params},
+    ]:
+        statements.append(tasks.tasks_feed_statement(filters))
+    statements += [
+        ('login_user', auth.LOGIN_USER_QUERY, ['anna.k@example.com']),
+        ('verify_session', auth.VERIFY_SESSION_QUERY, ['bench-session-token']),
+        ('user_profile', users.USER_PROFILE_QUERY, [1]),
+        ('user_work_history', users.USER_WORK_HISTORY_QUERY, [7]),
+    ]
+    return statements
+
+def planning_time(cur, sql: str, params) -> float:
+    """Planning Time в миллисекундах из EXPLAIN (ANALYZE)"""
+    cur.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + sql, params)
+    return cur.fetchone()[0][0]['Planning Time']
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    print(f'{"statement":<40} {"raw, ms":>10} {"prepared, ms":>14} {"saved, ms":>10}')
+    for name, sql, params in hot_statements():
+        raw_sql = re.sub(r'\$(\d+)', r'%(p\1)s', sql)
+        raw_params = {f'p{i}': value for i, value in enumerate(params, start=1)}
+        placeholders = ', '.join(['%s'] * len(params))
+        execute_sql = f'EXECUTE {name} ({placeholders})' if params else f'EXECUTE {name}'
+
+        cur.execute(f'PREPARE {name} AS {sql}')
+        raw = statistics.median(planning_time(cur, raw_sql, raw_params) for _ in range(repeats))
+        prepared = statistics.median(planning_time(cur, execute_sql, params) for _ in range(repeats))
+        cur.execute(f'DEALLOCATE {name}')
+
+        print(f'{name:<40} {raw:>10.3f} {prepared:>14.3f} {raw - prepared:>10.3f}')
+
+    cur.close()
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,196 @@
 """API для работы с задачами и пользователями"""
 import json
+import math
 import os
+import re
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
 
+TASKS_FEED_QUERY = """
+    SELECT 
+        t.id, t.title, t.description, t.price, t.category, 
+        t.location, t.city, t.district, t.execution_date as date, t.status,
+        u.name as author_name, u.rating as author_rating, u.avatar_url as author_avatar,
+        (SELECT COUNT(*) FROM task_responses WHERE task_id = t.id) as responses
+    FROM tasks t
+    JOIN users u ON t.author_id = u.id
+    WHERE 1=1{filters}
+    ORDER BY t.created_at DESC
+"""
+
+# Расстояние по формуле гаверсинуса до точки (${0}, ${1}) не больше ${2} км.
+# LEAST защищает asin от аргумента чуть больше 1 из-за округления.
+RADIUS_DISTANCE_CONDITION = """2 * 6371 * asin(LEAST(1.0, sqrt(
+            power(sin(radians(t.latitude - ${0}::float8) / 2), 2)
+            + cos(radians(${0}::float8)) * cos(radians(t.latitude))
+            * power(sin(radians(t.longitude - ${1}::float8) / 2), 2)
+        ))) <= ${2}::float8"""
+
+# Фильтры ленты задач: имя -> условие с позиционными параметрами.
+# Варианты фильтра по радиусу строит radius_filter: ограничивающий прямоугольник
+# (${3}..${6}) использует индекс по координатам, гаверсинус отсекает углы.
+TASKS_FEED_FILTERS = [
+    ('category', 't.category = ${0}'),
+    ('status', 't.status = ${0}'),
+    ('city', 't.city_key = ${0}'),
+    ('district', 't.district_key = ${0}'),
+    ('radius', """t.latitude BETWEEN ${3}::float8 AND ${4}::float8
+        AND t.longitude BETWEEN ${5}::float8 AND ${6}::float8
+        AND """ + RADIUS_DISTANCE_CONDITION),
+    ('radius_wrapped', """t.latitude BETWEEN ${3}::float8 AND ${4}::float8
+        AND (t.longitude >= ${5}::float8 OR t.longitude <= ${6}::float8)
+        AND """ + RADIUS_DISTANCE_CONDITION),
+    ('radius_polar', """t.latitude BETWEEN ${3}::float8 AND ${4}::float8
+        AND """ + RADIUS_DISTANCE_CONDITION),
+]
+
+EARTH_RADIUS_KM = 6371
+MAX_RADIUS_KM = 1000
+
+# Нормализация местоположения повторяется в db_migrations/V0003__add_task_location_index.sql
+# для заполнения старых задач — выражения ниже менять вместе с ней. Регистр задан
+# явно, а не через lower() базы, чтобы результат не зависел от LC_CTYPE.
+WHITESPACE = re.compile(r'[ \t\r\n]+')
+
+# Приставки перед названием города: "г. Москва", "город Москва"
+CITY_PREFIX = re.compile(r'^([гГ]\.|[гГ][оО][рР]\.|[гГ] |[гГ][оО][рР][оО][дД] ) *')
+
+# Ключ поиска по городу и району: название в нижнем регистре по таблице букв
+UPPER_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+LOWER_LETTERS = 'abcdefghijklmnopqrstuvwxyzабвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+LOCATION_KEY_TABLE = str.maketrans(UPPER_LETTERS, LOWER_LETTERS)
+
+# Координаты центра известных городов по ключу города (для задач без точных
+# координат). Тот же список — known_cities в миграции V0003.
+CITY_COORDINATES = {
+    'москва': (55.7558, 37.6173),
+    'санкт-петербург': (59.9343, 30.3351),
+}
+
+_conn = None
+_prepared = set()
+
 def get_db_connection():
-    """Создание подключения к базе данных"""
-    return psycopg2.connect(os.environ['DATABASE_URL'])
+    """Подключение к базе данных, переиспользуемое между вызовами функции"""
+    global _conn
+    if _conn is None or _conn.closed:
+        _conn = psycopg2.connect(
+            os.environ['DATABASE_URL'],
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3
+        )
+        _prepared.clear()
+    return _conn
+
+def release_db_connection():
+    """Завершение транзакции запроса без закрытия подключения"""
+    if _conn is None or _conn.closed:
+        return
+    try:
+        _conn.rollback()
+    except psycopg2.Error:
+        _conn.close()
+
+def tasks_feed_statement(filters: dict) -> tuple:
+    """Имя, текст и параметры подготовленного запроса ленты для набора фильтров"""
+    names = ['tasks_feed']
+    conditions = ''
+    params = []
+    for name, condition in TASKS_FEED_FILTERS:
+        if name in filters:
+            positions = range(len(params) + 1, len(params) + len(filters[name]) + 1)
+            params.extend(filters[name])
+            names.append(name)
+            conditions += ' AND ' + condition.format(*positions)
+    return '_'.join(names), TASKS_FEED_QUERY.format(filters=conditions), params
+
+def clean_place_name(value: str) -> str:
+    """Схлопывание пробелов и обрезка по краям"""
+    return WHITESPACE.sub(' ', value).strip(' ')
+
+def normalize_city(value: str):
+    """Название города в исходном написании без приставки «г.» или «город»"""
+    return CITY_PREFIX.sub('', clean_place_name(value)) or None
+
+def normalize_district(value: str):
+    """Название района в исходном написании"""
+    return clean_place_name(value) or None
+
+def location_key(value):
+    """Ключ для поиска по городу или району без учёта регистра"""
+    return value.translate(LOCATION_KEY_TABLE) if value else None
+
+def normalize_location(location: str) -> tuple:
+    """Разбор строки местоположения на город и район"""
+    parts = location.split(',')
+    city = normalize_city(parts[0])
+    district = normalize_district(parts[1]) if len(parts) > 1 else None
+    return city, district
+
+def parse_coordinates(latitude, longitude):
+    """Широта и долгота как float, если обе в допустимом диапазоне, иначе None"""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+def radius_filter(latitude: float, longitude: float, radius: float) -> tuple:
+    """Вариант фильтра по радиусу и его параметры.
+
+    Если круг захватывает полюс, долгота не ограничивается; если пересекает
+    меридиан ±180°, диапазон долготы разбивается на два.
+    """
+    angular = radius / EARTH_RADIUS_KM
+    min_lat = latitude - math.degrees(angular)
+    max_lat = latitude + math.degrees(angular)
+    if min_lat <= -90 or max_lat >= 90:
+        return 'radius_polar', [latitude, longitude, radius, max(min_lat, -90.0), min(max_lat, 90.0)]
+    delta_lng = math.degrees(math.asin(math.sin(angular) / math.cos(math.radians(latitude))))
+    min_lng = longitude - delta_lng
+    max_lng = longitude + delta_lng
+    if min_lng < -180 or max_lng > 180:
+        wrap = lambda value: (value + 540) % 360 - 180
+        return 'radius_wrapped', [latitude, longitude, radius, min_lat, max_lat, wrap(min_lng), wrap(max_lng)]
+    return 'radius', [latitude, longitude, radius, min_lat, max_lat, min_lng, max_lng]
+
+def execute_prepared(cur, name: str, sql: str, params: list):
+    """Выполнение запроса по имени; PREPARE выполняется один раз на подключение.
+
+    Подготовленные запросы живут в серверной сессии, поэтому DATABASE_URL должен
+    вести напрямую в Postgres или через пулер в режиме сессий (не транзакций).
+    """
+    if name not in _prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        _prepared.add(name)
+    if params:
+        placeholders = ', '.join(['%s'] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+def execute_first(cur, sql: str, params, prepared: str = None) -> tuple:
+    """Первый запрос обработчика с одним повтором при разорванном подключении.
+
+    Сервер может закрыть простаивающее подключение между вызовами функции.
+    До первого запроса транзакция пуста, поэтому после переподключения его
+    можно безопасно повторить, в том числе для записи.
+    """
+    for attempt in range(2):
+        try:
+            if prepared:
+                execute_prepared(cur, prepared, sql, params)
+            else:
+                cur.execute(sql, params)
+            return cur.connection, cur
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if attempt or not cur.connection.closed:
+                raise
+            cur = get_db_connection().cursor(cursor_factory=type(cur))
 
 def handler(event: dict, context) -> dict:
     """Обработчик запросов для задач"""
@@ -46,39 +229,60 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': str(e)}),
             'isBase64Encoded': False
         }
+    finally:
+        release_db_connection()
 
 def get_tasks(event: dict) -> dict:
     """Получение списка задач с фильтрацией"""
     params = event.get('queryStringParameters') or {}
     category = params.get('category')
     status = params.get('status')
+    city = params.get('city')
+    district = params.get('district')
+    
+    radius = None
+    if any(params.get(key) for key in ('lat', 'lng', 'radius')):
+        point = parse_coordinates(params.get('lat'), params.get('lng'))
+        try:
+            radius = float(params.get('radius'))
+        except (TypeError, ValueError):
+            radius = None
+        if not point or radius is None or not (0 < radius <= MAX_RADIUS_KM):
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({
+                    'error': f'Radius filter requires lat in [-90, 90], lng in [-180, 180] '
+                             f'and radius in (0, {MAX_RADIUS_KM}] km'
+                }),
+                'isBase64Encoded': False
+            }
     
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    query = """
-        SELECT 
-            t.id, t.title, t.description, t.price, t.category, 
-            t.location, t.execution_date as date, t.status,
-            u.name as author_name, u.rating as author_rating, u.avatar_url as author_avatar,
-            (SELECT COUNT(*) FROM task_responses WHERE task_id = t.id) as responses
-        FROM tasks t
-        JOIN users u ON t.author_id = u.id
-        WHERE 1=1
-    """
-    query_params = []
+    filters = {}
     
     if category and category != 'Все категории':
-        query += " AND t.category = %s"
-        query_params.append(category)
+        filters['category'] = [category]
     
     if status:
-        query += " AND t.status = %s"
-        query_params.append(status)
+        filters['status'] = [status]
     
-    query += " ORDER BY t.created_at DESC"
+    city_key = location_key(normalize_city(city)) if city else None
+    if city_key:
+        filters['city'] = [city_key]
     
-    cur.execute(query, query_params)
+    district_key = location_key(normalize_district(district)) if district else None
+    if district_key:
+        filters['district'] = [district_key]
+    
+    if radius:
+        radius_name, radius_params = radius_filter(point[0], point[1], radius)
+        filters[radius_name] = radius_params
+    
+    name, query, query_params = tasks_feed_statement(filters)
+    conn, cur = execute_first(cur, query, query_params, prepared=name)
     tasks = cur.fetchall()
     
     result = []
@@ -90,6 +294,8 @@ def get_tasks(event: dict) -> dict:
             'price': task['price'],
             'category': task['category'],
             'location': task['location'],
+            'city': task['city'],
+            'district': task['district'],
             'date': task['date'].strftime('%d.%m.%Y') if task['date'] else '',
             'status': task['status'],
             'author': {
@@ -101,7 +307,6 @@ def get_tasks(event: dict) -> dict:
         })
     
     cur.close()
-    conn.close()
     
     return {
         'statusCode': 200,
@@ -124,12 +329,45 @@ def create_task(event: dict) -> dict:
                 'isBase64Encoded': False
             }
     
+    if not isinstance(body['location'], str):
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Field location must be a string'}),
+            'isBase64Encoded': False
+        }
+    
+    city, district = normalize_location(body['location'])
+    latitude, longitude = CITY_COORDINATES.get(location_key(city), (None, None))
+    
+    if body.get('latitude') is not None or body.get('longitude') is not None:
+        coordinates = None
+        if all(
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            for value in (body.get('latitude'), body.get('longitude'))
+        ):
+            coordinates = parse_coordinates(body['latitude'], body['longitude'])
+        if not coordinates:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({
+                    'error': 'Fields latitude and longitude must both be numbers '
+                             'in [-90, 90] and [-180, 180]'
+                }),
+                'isBase64Encoded': False
+            }
+        latitude, longitude = coordinates
+    
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    cur.execute("""
-        INSERT INTO tasks (title, description, price, category, location, execution_date, author_id)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    conn, cur = execute_first(cur, """
+        INSERT INTO tasks (
+            title, description, price, category, location, city, city_key,
+            district, district_key, latitude, longitude, execution_date, author_id
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         RETURNING id
     """, (
         body['title'],
@@ -137,6 +375,12 @@ def create_task(event: dict) -> dict:
         body['price'],
         body['category'],
         body['location'],
+        city,
+        location_key(city),
+        district,
+        location_key(district),
+        latitude,
+        longitude,
         body['execution_date'],
         body['author_id']
     ))
@@ -144,7 +388,6 @@ def create_task(event: dict) -> dict:
     task_id = cur.fetchone()['id']
     conn.commit()
     cur.close()
-    conn.close()
     
     return {
         'statusCode': 201,
@@ -168,7 +411,7 @@ def update_task(event: dict) -> dict:
     conn = get_db_connection()
     cur = conn.cursor()
     
-    cur.execute("""
+    conn, cur = execute_first(cur, """
         UPDATE tasks 
         SET status = %s, updated_at = CURRENT_TIMESTAMP
         WHERE id = %s
@@ -176,7 +419,6 @@ def update_task(event: dict) -> dict:
     
     conn.commit()
     cur.close()
-    conn.close()
     
     return {
         'statusCode': 200,
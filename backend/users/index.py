@@ -4,9 +4,82 @@ import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+USER_PROFILE_QUERY = """
+    SELECT 
+        u.id, u.name, u.email, u.phone, u.role, u.rating, 
+        u.avatar_url, u.bio, u.specializations, u.created_at,
+        (SELECT COUNT(*) FROM tasks WHERE author_id = u.id AND status = 'completed') as completed_tasks,
+        (SELECT COUNT(*) FROM tasks WHERE worker_id = u.id AND status = 'completed') as completed_works,
+        (SELECT SUM(price) FROM tasks WHERE worker_id = u.id AND status = 'completed') as total_earned
+    FROM users u
+    WHERE u.id = $1
+"""
+
+USER_WORK_HISTORY_QUERY = """
+    SELECT t.title, t.price, t.execution_date, r.rating, r.comment
+    FROM tasks t
+    LEFT JOIN reviews r ON t.id = r.task_id AND r.reviewee_id = $1
+    WHERE t.worker_id = $1 AND t.status = 'completed'
+    ORDER BY t.execution_date DESC
+    LIMIT 10
+"""
+
+_conn = None
+_prepared = set()
+
 def get_db_connection():
-    """Создание подключения к базе данных"""
-    return psycopg2.connect(os.environ['DATABASE_URL'])
+    """Подключение к базе данных, переиспользуемое между вызовами функции"""
+    global _conn
+    if _conn is None or _conn.closed:
+        _conn = psycopg2.connect(
+            os.environ['DATABASE_URL'],
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3
+        )
+        _prepared.clear()
+    return _conn
+
+def release_db_connection():
+    """Завершение транзакции запроса без закрытия подключения"""
+    if _conn is None or _conn.closed:
+        return
+    try:
+        _conn.rollback()
+    except psycopg2.Error:
+        _conn.close()
+
+def execute_prepared(cur, name: str, sql: str, params: list):
+    """Выполнение запроса по имени; PREPARE выполняется один раз на подключение.
+
+    Подготовленные запросы живут в серверной сессии, поэтому DATABASE_URL должен
+    вести напрямую в Postgres или через пулер в режиме сессий (не транзакций).
+    """
+    if name not in _prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        _prepared.add(name)
+    if params:
+        placeholders = ', '.join(['%s'] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+def execute_first(cur, sql: str, params, prepared: str = None) -> tuple:
+    """Первый запрос обработчика с одним повтором при разорванном подключении.
+
+    Сервер может закрыть простаивающее подключение между вызовами функции.
+    До первого запроса транзакция пуста, поэтому после переподключения его
+    можно безопасно повторить, в том числе для записи.
+    """
+    for attempt in range(2):
+        try:
+            if prepared:
+                execute_prepared(cur, prepared, sql, params)
+            else:
+                cur.execute(sql, params)
+            return cur.connection, cur
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if attempt or not cur.connection.closed:
+                raise
+            cur = get_db_connection().cursor(cursor_factory=type(cur))
 
 def handler(event: dict, context) -> dict:
     """Обработчик запросов для пользователей"""
@@ -43,6 +116,8 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': str(e)}),
             'isBase64Encoded': False
         }
+    finally:
+        release_db_connection()
 
 def get_user(event: dict) -> dict:
     """Получение профиля пользователя"""
@@ -60,22 +135,12 @@ def get_user(event: dict) -> dict:
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    cur.execute("""
-        SELECT 
-            u.id, u.name, u.email, u.phone, u.role, u.rating, 
-            u.avatar_url, u.bio, u.specializations, u.created_at,
-            (SELECT COUNT(*) FROM tasks WHERE author_id = u.id AND status = 'completed') as completed_tasks,
-            (SELECT COUNT(*) FROM tasks WHERE worker_id = u.id AND status = 'completed') as completed_works,
-            (SELECT SUM(price) FROM tasks WHERE worker_id = u.id AND status = 'completed') as total_earned
-        FROM users u
-        WHERE u.id = %s
-    """, (user_id,))
+    conn, cur = execute_first(cur, USER_PROFILE_QUERY, [user_id], prepared='user_profile')
     
     user = cur.fetchone()
     
     if not user:
         cur.close()
-        conn.close()
         return {
             'statusCode': 404,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -83,14 +148,7 @@ def get_user(event: dict) -> dict:
             'isBase64Encoded': False
         }
     
-    cur.execute("""
-        SELECT t.title, t.price, t.execution_date, r.rating, r.comment
-        FROM tasks t
-        LEFT JOIN reviews r ON t.id = r.task_id AND r.reviewee_id = %s
-        WHERE t.worker_id = %s AND t.status = 'completed'
-        ORDER BY t.execution_date DESC
-        LIMIT 10
-    """, (user_id, user_id))
+    execute_prepared(cur, 'user_work_history', USER_WORK_HISTORY_QUERY, [user_id])
     
     work_history = cur.fetchall()
     
@@ -122,7 +180,6 @@ def get_user(event: dict) -> dict:
     }
     
     cur.close()
-    conn.close()
     
     return {
         'statusCode': 200,
@@ -149,7 +206,7 @@ def create_user(event: dict) -> dict:
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     try:
-        cur.execute("""
+        conn, cur = execute_first(cur, """
             INSERT INTO users (name, email, phone, role, bio, specializations)
             VALUES (%s, %s, %s, %s, %s, %s)
             RETURNING id
@@ -180,4 +237,3 @@ def create_user(event: dict) -> dict:
         }
     finally:
         cur.close()
-        conn.close()
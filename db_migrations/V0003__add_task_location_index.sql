@@ -0,0 +1,51 @@
+-- Структурированное местоположение задачи: город, район и координаты.
+-- city/district хранят исходное написание, city_key/district_key — ключ поиска в нижнем регистре.
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS city VARCHAR(255);
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS city_key VARCHAR(255);
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS district VARCHAR(255);
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS district_key VARCHAR(255);
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+
+-- Заполнение для существующих задач из строки location.
+-- Повторяет normalize_city / normalize_district / location_key и CITY_COORDINATES
+-- из backend/tasks/index.py — менять вместе. Регистр приводится через translate()
+-- по явной таблице букв (UPPER_LETTERS / LOWER_LETTERS), а не через lower(),
+-- поэтому результат не зависит от LC_CTYPE базы.
+WITH known_cities(city_key, latitude, longitude) AS (
+    VALUES
+        ('москва', 55.7558::float8, 37.6173::float8),
+        ('санкт-петербург', 59.9343::float8, 30.3351::float8)
+),
+parts AS (
+    SELECT
+        id,
+        NULLIF(regexp_replace(
+            btrim(regexp_replace(split_part(location, ',', 1), '[ \t\r\n]+', ' ', 'g')),
+            '^([гГ]\.|[гГ][оО][рР]\.|[гГ] |[гГ][оО][рР][оО][дД] ) *', ''
+        ), '') AS city,
+        NULLIF(btrim(regexp_replace(split_part(location, ',', 2), '[ \t\r\n]+', ' ', 'g')), '') AS district
+    FROM tasks
+),
+normalized AS (
+    SELECT
+        id, city, district,
+        translate(city, 'ABCDEFGHIJKLMNOPQRSTUVWXYZАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ', 'abcdefghijklmnopqrstuvwxyzабвгдеёжзийклмнопрстуфхцчшщъыьэюя') AS city_key,
+        translate(district, 'ABCDEFGHIJKLMNOPQRSTUVWXYZАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ', 'abcdefghijklmnopqrstuvwxyzабвгдеёжзийклмнопрстуфхцчшщъыьэюя') AS district_key
+    FROM parts
+)
+UPDATE tasks t
+SET city = n.city,
+    city_key = n.city_key,
+    district = n.district,
+    district_key = n.district_key,
+    latitude = COALESCE(t.latitude, k.latitude),
+    longitude = COALESCE(t.longitude, k.longitude)
+FROM normalized n
+LEFT JOIN known_cities k ON k.city_key = n.city_key
+WHERE t.id = n.id AND t.city_key IS NULL;
+
+-- Индексы для фильтрации по региону и радиусу
+CREATE INDEX IF NOT EXISTS idx_tasks_city_district_key ON tasks(city_key, district_key);
+CREATE INDEX IF NOT EXISTS idx_tasks_district_key ON tasks(district_key);
+CREATE INDEX IF NOT EXISTS idx_tasks_coordinates ON tasks(latitude, longitude);